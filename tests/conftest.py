@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from app.train import load_data, preprocess_data
+
+
+# Housing prices table, loaded once per test session
+@pytest.fixture(scope="session")
+def dataset():
+    return load_data()
+
+# (X_train, X_test, y_train, y_test, scaler) splits, computed once per test session
+# without shuffling, tests only need a valid split
+@pytest.fixture(scope="session")
+def splits(dataset):
+    return preprocess_data(dataset, shuffle=False)
+
+# Small synthetic regression problem, y depends on the first two of three features
+@pytest.fixture
+def synthetic_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 3))
+    y = X @ np.array([1.0, 0.5, 0.0]) + rng.normal(scale=0.1, size=200)
+    return X, y
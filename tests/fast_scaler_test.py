@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.fast_scaler import FastStandardScaler
+from sklearn.preprocessing import StandardScaler
+
+
+# Test transform matches sklearn's StandardScaler
+def test_fast_scaler_matches_standard_scaler():
+    rng = np.random.default_rng(0)
+    X = rng.normal(loc=50, scale=10, size=(100, 10))
+    X[:, 3] = 1.0  # constant feature
+
+    expected = StandardScaler().fit_transform(X)
+    result = FastStandardScaler().fit_transform(X)
+
+    np.testing.assert_allclose(result, expected, rtol=1e-6, atol=1e-9)
+
+# Test output dtype and memory layout
+def test_fast_scaler_dtype():
+    X = np.arange(20, dtype=np.int64).reshape(10, 2)
+    result = FastStandardScaler(dtype=np.float32).fit(X).transform(X)
+
+    assert result.dtype == np.float32, "Output dtype not honored"
+    assert result.flags["C_CONTIGUOUS"], "Output is not C-contiguous"
+
+# Test feature count check
+def test_fast_scaler_feature_mismatch():
+    scaler = FastStandardScaler().fit(np.ones((5, 3)))
+
+    with pytest.raises(ValueError):
+        scaler.transform(np.ones((5, 2)))
+
+
+# Test non-finite features are rejected
+def test_fast_scaler_rejects_nan():
+    X = np.ones((5, 3))
+    X[2, 1] = np.nan
+
+    with pytest.raises(ValueError):
+        FastStandardScaler().fit(X)
+
+# Test DataFrame columns are checked against the names seen during fit
+def test_fast_scaler_feature_names():
+    X = pd.DataFrame({"a": [1.0, 2.0, 3.0], "b": [10.0, 20.0, 40.0]})
+    scaler = FastStandardScaler().fit(X)
+
+    with pytest.raises(ValueError):
+        scaler.transform(X[["b", "a"]])
+
+    scaler.fit(X.to_numpy())
+    assert not hasattr(scaler, "feature_names_in_"), "Stale feature names kept after refit"
@@ -1,38 +1,127 @@
 import os
 import pytest
 import pandas as pd
-from app.train import load_data, preprocess_data, create_pipeline, train_model
+from app.train import create_pipeline, train_model, log_model, screen_alphas, stage_model_code, get_engine, dispose_engines, DEFAULT_PARAM_GRID
+from app.fast_scaler import FastStandardScaler
+import numpy as np
+from sklearn.linear_model import LassoCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV
 from unittest import mock
 from sqlalchemy import create_engine
 
 
 # Test data loading
-def test_load_data():
-    dataset = load_data()
-    
+def test_load_data(dataset):
     assert not dataset.empty, "Dataframe is empty"
 
 # Test data preprocessing
-def test_preprocess_data():
-    dataset = load_data()
-    X_train, X_test, y_train, y_test = preprocess_data(dataset)
+def test_preprocess_data(splits):
+    X_train, X_test, y_train, y_test, scaler = splits
 
     assert len(X_train) > 0, "Training data is empty"
     assert len(X_test) > 0, "Test data is empty"
+    assert hasattr(scaler, "mean_"), "Scaler not fitted on training data"
 
 # Test pipeline creation
 def test_create_pipeline():
     pipeline = create_pipeline()
 
-    assert "standard_scaler" in pipeline.named_steps, "Standard scaler missing in pipeline"
+    assert "standard_scaler" not in pipeline.named_steps, "Standard scaler should be fitted outside the pipeline"
     assert "lasso" in pipeline.named_steps, "Lasso regressor missing in pipeline"
 
 # Test model training (mocking GridSearchCV)
 @mock.patch('app.train.GridSearchCV.fit', return_value=None)
-def test_train_model(mock_fit):
-    param_grid = {"lasso__alpha": [100]}
+def test_train_model(mock_fit, splits):
     pipe = create_pipeline()
-    X_train, X_test, y_train, y_test = preprocess_data(load_data())
-    model = train_model(pipe, X_train, y_train, param_grid)
+    X_train, X_test, y_train, y_test, scaler = splits
+    model = train_model(pipe, X_train, y_train, DEFAULT_PARAM_GRID, n_jobs=1, search_cls=GridSearchCV)
 
-    assert model is not None, "Model training failed"
\ No newline at end of file
+    assert model is not None, "Model training failed"
+
+# Test model training along the Lasso path (mocking LassoCV)
+@mock.patch('app.train.LassoCV.fit', return_value=None)
+def test_train_model_alpha_path(mock_fit, splits):
+    pipe = create_pipeline()
+    X_train, X_test, y_train, y_test, scaler = splits
+    model = train_model(pipe, X_train, y_train, DEFAULT_PARAM_GRID, n_jobs=1)
+
+    assert isinstance(model.named_steps["lasso"], LassoCV), "Alpha grid not solved along the Lasso path"
+
+# Test alpha screening keeps a single all-zero candidate
+def test_screen_alphas(synthetic_data):
+    X, y = synthetic_data
+    alphas = screen_alphas(X, y, [0.01, 0.1, 100, 200, 300])
+
+    assert alphas == [0.01, 0.1, 100], "Alphas zeroing every coefficient not screened out"
+
+# Test the logged model chains the scaler and takes raw named features (mocking MLflow)
+@mock.patch('mlflow.sklearn.log_model')
+def test_log_model_includes_scaler(mock_log_model, synthetic_data):
+    X, y = synthetic_data
+    X = pd.DataFrame(X, columns=["square_feet", "num_bedrooms", "num_floors"])
+    y = y.astype(np.float32)
+    scaler = FastStandardScaler(dtype=np.float32).fit(X)
+    model = train_model(create_pipeline(), scaler.transform(X), y, {"lasso__alpha": [0.01, 0.1]}, n_jobs=1)
+    log_model(model, X, "housing-prices-estimator", "housing-prices-estimator-LR", scaler=scaler)
+
+    logged = mock_log_model.call_args.kwargs
+    assert list(logged["sk_model"].named_steps) == ["standard_scaler", "lasso"], "Scaler missing in logged model"
+    assert logged["signature"].inputs.input_names() == list(X.columns), "Signature not inferred from raw features"
+
+# Test model training with successive halving (real fit on small data)
+def test_train_model_halving(synthetic_data):
+    X, y = synthetic_data
+    model = train_model(create_pipeline(), X.astype(np.float32), y.astype(np.float32), {"lasso__alpha": [0.01, 0.1, 0.5]},
+                        n_jobs=1, search_cls=HalvingGridSearchCV)
+
+    assert model.best_params_["lasso__alpha"] == 0.01, "Halving search did not pick the best alpha"
+
+# Test alpha screening leaves the grid alone when the threshold isn't finite
+def test_screen_alphas_non_finite():
+    X = np.ones((30, 2))
+    X[0, 0] = np.nan
+    alphas = screen_alphas(X, np.arange(30.0), [0.1, 1.0])
+
+    assert alphas == [0.1, 1.0], "Alpha grid emptied by a non-finite threshold"
+
+# Test the alpha picked along the Lasso path is logged like GridSearchCV autolog (mocking MLflow)
+@mock.patch('mlflow.log_metric')
+@mock.patch('mlflow.log_param')
+@mock.patch('mlflow.active_run', return_value=mock.Mock())
+def test_train_model_alpha_path_logs_best(mock_active_run, mock_log_param, mock_log_metric, synthetic_data):
+    X, y = synthetic_data
+    model = train_model(create_pipeline(), X.astype(np.float32), y.astype(np.float32),
+                        {"lasso__alpha": [0.01, 0.1, 0.5]}, n_jobs=1)
+
+    mock_log_param.assert_called_once_with("best_lasso__alpha", model.named_steps["lasso"].alpha_)
+    name, score = mock_log_metric.call_args.args
+    assert name == "best_cv_score", "CV score not logged under GridSearchCV's key"
+    assert 0.9 < score <= 1.0, "CV score is not a mean R2"
+
+# Test only the modules the logged pickle needs are staged as model code
+def test_stage_model_code(tmp_path):
+    staged = stage_model_code(str(tmp_path))
+
+    assert sorted(p.name for p in tmp_path.joinpath("app").iterdir()) == ["__init__.py", "fast_scaler.py"], \
+        "Unexpected files shipped with the model"
+    assert staged == str(tmp_path / "app"), "Staged package not named app"
+
+# Test non-finite training data is rejected before the unchecked fits
+def test_train_model_rejects_nan(synthetic_data):
+    X, y = synthetic_data
+    X = X.copy()
+    X[0, 0] = np.nan
+
+    with pytest.raises(ValueError):
+        train_model(create_pipeline(), X, y, {"lasso__alpha": [0.01, 0.1]}, n_jobs=1)
+
+# Test engines are shared per database URI
+def test_get_engine_per_uri(tmp_path):
+    first_uri, second_uri = f"sqlite:///{tmp_path / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"
+    try:
+        assert get_engine(first_uri) is get_engine(first_uri), "Engine not shared for the same URI"
+        assert get_engine(first_uri) is not get_engine(second_uri), "Engine reused across URIs"
+        assert str(get_engine(second_uri).url) == second_uri, "Engine bound to the wrong URI"
+    finally:
+        dispose_engines()
\ No newline at end of file